@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+データパイプライン・サーバーのベンチマークスクリプト
+合成した model/ ツリー(bench/synth_tree.py)に対して各処理の実行時間とメモリ使用量(tracemalloc のピーク)を計測し、
+結果をJSONに記録してベースラインと比較する
+
+計測対象:
+    パイプライン  generate_qa_all.py, generate_qa_shuffle.py, copy_missing_files.py,
+                  model/imagejson_edit.py, model/add_textcount.py, model/question_edit.py,
+                  image_index.py(Pillow がある場合), translate_qa.py(stub バックエンド)
+    サーバー      server.py の静的ファイルGET, HEADによる存在確認, /save-json
+
+各回の計測は新しく生成したツリーで行い、時間は --repeat 回の最小値を採用する。
+メモリは tracemalloc を有効にした別の1回で計測する。子プロセスを使う処理(image_index_cold)は
+tracemalloc を使わない別プロセス(spawn)でもう1回実行し、その子プロセスの最大RSS(getrusage)を
+child_peak_kib として記録する。
+--stages で処理を選んだ場合、前提となる処理は計測せずに先に実行する。
+各処理の後には出力ファイルを確認し、期待どおりでなければエラーにする。
+ベースラインとフォルダ数・シード・リクエスト数が異なる場合は比較しない。
+
+使い方:
+    python bench/run_bench.py                               # 73フォルダで計測し、ベースラインと比較
+    python bench/run_bench.py --folders 10000 --repeat 1
+    python bench/run_bench.py --save-baseline               # 計測結果をベースラインとして保存
+"""
+
+import argparse
+import contextlib
+import gc
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import runpy
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+import synth_tree  # noqa: E402
+
+DEFAULT_OUTPUT = Path('bench_results.json')
+DEFAULT_BASELINE = BENCH_DIR / 'baseline.json'
+
+# ベースラインに対してこの割合を超えて遅く(大きく)なったら回帰とみなす
+DEFAULT_THRESHOLD = 0.25
+# これより短い処理の時間差は誤差として扱う
+MIN_SECONDS = 0.05
+
+DEFAULT_REQUESTS = 200
+
+# ベースラインと一致していなければ比較しない条件
+COMPARE_KEYS = ['folders', 'seed', 'requests']
+
+
+# ===== パイプラインの各処理 =====
+
+def stage_generate_qa_all(root: Path) -> None:
+    import generate_qa_all
+    generate_qa_all.main()
+
+
+def stage_generate_qa_shuffle(root: Path) -> None:
+    import generate_qa_shuffle
+    generate_qa_shuffle.main()
+
+
+def stage_copy_missing_files(root: Path) -> None:
+    import copy_missing_files
+    copy_missing_files.SOURCE_DIR = root / 'source_model'
+    copy_missing_files.DEST_DIR = root / 'model'
+    copy_missing_files.copy_missing_files(copy_missing_files.find_missing_files(), dry_run=False)
+
+
+def _run_model_script(root: Path, script_name: str) -> None:
+    """
+    model/ 内の編集スクリプトを model/ をカレントディレクトリとして実行する
+    """
+    cwd = os.getcwd()
+    os.chdir(root / 'model')
+    try:
+        runpy.run_path(str(REPO_ROOT / 'model' / script_name), run_name='__main__')
+    except SystemExit as e:
+        if e.code:
+            raise RuntimeError(f"{script_name} が終了コード {e.code} で終了しました")
+    finally:
+        os.chdir(cwd)
+
+
+def stage_imagejson_edit(root: Path) -> None:
+    _run_model_script(root, 'imagejson_edit.py')
+
+
+def stage_add_textcount(root: Path) -> None:
+    _run_model_script(root, 'add_textcount.py')
+
+
+def stage_question_edit(root: Path) -> None:
+    _run_model_script(root, 'question_edit.py')
+
+
+def stage_image_index_cold(root: Path) -> None:
+    import image_index
+    image_index.build_index(['model', 'out/model'], cache_file=root / 'image_index_cache.json')
+
+
+def stage_image_index_warm(root: Path) -> None:
+    # 直前の cold で作成したキャッシュを使う
+    stage_image_index_cold(root)
+
+
+def stage_translate_qa(root: Path) -> None:
+    import translate_qa
+    with open('qa_all_1030.json', 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    memory = translate_qa.TranslationMemory(root / 'translation_memory_stub_en.json')
+    missing = [t for t in translate_qa.collect_unique_texts(questions) if t not in memory]
+    translate_qa.translate_missing(missing, memory, translate_qa.StubTranslator(), 'en',
+                                   translate_qa.DEFAULT_BATCH_SIZE, translate_qa.DEFAULT_CONCURRENCY)
+    translated = [translate_qa.translate_question(q, memory) for q in questions]
+    translate_qa.write_outputs(translated, Path('model'), 'en')
+
+
+def _pillow_available() -> Optional[str]:
+    import image_index
+    return None if image_index.Image is not None else 'Pillow がインストールされていません'
+
+
+# ===== 出力の確認 =====
+# 各スクリプトはエラーを表示して終了するだけのものが多く、表示は計測中に捨てているため、出力ファイルで成否を確認する
+
+def _load_json(path: Path) -> Any:
+    if not path.exists():
+        raise RuntimeError(f"{path} が作成されていません")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _first_folder(root: Path) -> Path:
+    return min(p for p in (root / 'model').iterdir() if p.is_dir())
+
+
+def check_generate_qa_all(root: Path) -> None:
+    if not _load_json(root / 'qa_all_1030.json'):
+        raise RuntimeError("qa_all_1030.json が空です")
+
+
+def check_generate_qa_shuffle(root: Path) -> None:
+    if len(_load_json(root / 'qa_all_shuffle_1030.json')) != len(_load_json(root / 'qa_all_1030.json')):
+        raise RuntimeError("qa_all_shuffle_1030.json の問題数が qa_all_1030.json と一致しません")
+
+
+def check_copy_missing_files(root: Path) -> None:
+    import copy_missing_files
+    if copy_missing_files.find_missing_files():
+        raise RuntimeError("copy_missing_files.py の実行後もコピーされていないファイルがあります")
+
+
+def check_imagejson_edit(root: Path) -> None:
+    folder = _first_folder(root)
+    if _load_json(folder / 'image.json').get('features') != '基礎的な図':
+        raise RuntimeError(f"{folder / 'image.json'} の features が更新されていません")
+
+
+def check_add_textcount(root: Path) -> None:
+    folder = _first_folder(root)
+    source = _load_json(root / 'model' / 'ModelVista_new20250927_edited.json')
+    expected = int(next(it['この図中の文字数'] for it in source if it['image_id'] == folder.name))
+    if _load_json(folder / 'image.json')['powerpoint_ja.png'].get('text_count') != expected:
+        raise RuntimeError(f"{folder / 'image.json'} の text_count が更新されていません")
+
+
+def check_question_edit(root: Path) -> None:
+    _load_json(_first_folder(root) / 'question001_ja.json')
+
+
+def check_image_index(root: Path) -> None:
+    cache = _load_json(root / 'image_index_cache.json')
+    if not cache.get('hashes'):
+        raise RuntimeError("image_index_cache.json にハッシュがありません")
+
+
+def check_translate_qa(root: Path) -> None:
+    questions = _load_json(_first_folder(root) / 'qa_new_en.json')
+    if not all(q.get('is_translated') for q in questions):
+        raise RuntimeError("qa_new_en.json に is_translated: true でない問題があります")
+
+
+# (名前, 関数, 出力の確認, 前提となる処理, スキップ判定, 子プロセスを使うか)
+PIPELINE_STAGES = [
+    ('generate_qa_all', stage_generate_qa_all, check_generate_qa_all, [], None, False),
+    ('generate_qa_shuffle', stage_generate_qa_shuffle, check_generate_qa_shuffle,
+     ['generate_qa_all'], None, False),
+    ('copy_missing_files', stage_copy_missing_files, check_copy_missing_files, [], None, False),
+    ('model/imagejson_edit', stage_imagejson_edit, check_imagejson_edit, [], None, False),
+    ('model/add_textcount', stage_add_textcount, check_add_textcount, [], None, False),
+    ('model/question_edit', stage_question_edit, check_question_edit, [], None, False),
+    ('image_index_cold', stage_image_index_cold, check_image_index, [], _pillow_available, True),
+    ('image_index_warm', stage_image_index_warm, check_image_index,
+     ['image_index_cold'], _pillow_available, False),
+    ('translate_qa_stub', stage_translate_qa, check_translate_qa, ['generate_qa_all'], None, False),
+]
+
+
+# ===== サーバーの各ルート =====
+
+def _request(port: int, method: str, path: str, body: Optional[bytes] = None) -> int:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _expect(status: int, expected: int, path: str) -> None:
+    if status != expected:
+        raise RuntimeError(f"{path} が {status} を返しました (期待値: {expected})")
+
+
+def route_static_get(port: int, folders: List[str]) -> None:
+    for folder in folders:
+        for name in ['image.json', 'qa_new_ja.json', 'dgpowerpoint_ja-fs8.png']:
+            path = f"/model/{folder}/{name}"
+            _expect(_request(port, 'GET', path), 200, path)
+
+
+def route_head_probe(port: int, folders: List[str]) -> None:
+    # src/app.js と同様に、QAファイル・approvedファイル・画像の存在をHEADで確認する
+    # (qa_new_ja2.json は一部のフォルダにしかないため結果を問わない)
+    for folder in folders:
+        for name, expected in [('qa_new_ja.json', 200), ('qa_new_ja2.json', None),
+                               ('qa_new_ja_approved.json', 404), ('dghandwritten_ja-fs8.png', 200)]:
+            path = f"/model/{folder}/{name}"
+            status = _request(port, 'HEAD', path)
+            if expected is not None:
+                _expect(status, expected, path)
+
+
+def route_save_json(port: int, folders: List[str]) -> None:
+    for folder in folders:
+        data = json.dumps({'folderName': folder, 'reviews': {}}, ensure_ascii=False, indent=2)
+        body = json.dumps({'folderName': folder, 'filename': 'review_status.json', 'data': data}).encode('utf-8')
+        _expect(_request(port, 'POST', '/save-json', body), 200, '/save-json')
+        if not Path('model', folder, 'review_status.json').exists():
+            raise RuntimeError(f"/save-json の後に model/{folder}/review_status.json がありません")
+
+
+SERVER_ROUTES = [
+    ('server_static_get', route_static_get),
+    ('server_head_probe', route_head_probe),
+    ('server_save_json', route_save_json),
+]
+
+
+@contextlib.contextmanager
+def running_server():
+    """
+    server.py のハンドラで空きポートにサーバーを起動する(カレントディレクトリを配信)
+    """
+    import server
+
+    class QuietHandler(server.ReviewToolHandler):
+        def log_message(self, format, *args):
+            pass
+
+    httpd = socketserver.TCPServer(('127.0.0.1', 0), QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd.server_address[1]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+# ===== 計測 =====
+
+def measure(func: Callable, args: tuple, trace: bool) -> Dict[str, float]:
+    """
+    1つの処理の実行時間(秒)と、trace=True の場合はメモリのピーク(KiB)を計測する
+    """
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+        result = {'seconds': elapsed}
+        if trace:
+            result['peak_kib'] = tracemalloc.get_traced_memory()[1] / 1024
+        return result
+    finally:
+        if trace:
+            tracemalloc.stop()
+
+
+def run_pass(workdir: Path, folders: int, seed: int, requests: int, trace: bool,
+             selected: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    新しい合成ツリーを生成し、全ての処理を1回ずつ計測する
+    """
+    root = workdir / ('trace' if trace else 'time')
+    if root.exists():
+        shutil.rmtree(root)
+    stats = synth_tree.generate_tree(root, folders, seed)
+
+    cwd = os.getcwd()
+    env_before = os.environ.get('MODELVISTA_MODEL_ROOT')
+    os.environ['MODELVISTA_MODEL_ROOT'] = str(root / 'model')
+    os.chdir(root)
+    results = {}
+    required = required_stages(selected)
+    try:
+        for name, func, check, _, skip_check, _ in PIPELINE_STAGES:
+            if name not in required:
+                continue
+            reason = skip_check() if skip_check else None
+            if reason:
+                results[name] = {'skipped': reason}
+                continue
+            if selected and name not in selected:
+                # 前提となる処理は計測せずに実行する
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    func(root)
+            else:
+                results[name] = measure(func, (root,), trace)
+            check(root)
+
+        sample = sorted(p.name for p in (root / 'model').iterdir() if p.is_dir())[:requests]
+        server_routes = [(n, f) for n, f in SERVER_ROUTES if n in required]
+        if server_routes:
+            with running_server() as port:
+                for name, func in server_routes:
+                    results[name] = measure(func, (port, sample), trace)
+                    results[name]['requests'] = len(sample)
+    finally:
+        os.chdir(cwd)
+        if env_before is None:
+            os.environ.pop('MODELVISTA_MODEL_ROOT', None)
+        else:
+            os.environ['MODELVISTA_MODEL_ROOT'] = env_before
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {'stats': stats, 'stages': results}
+
+
+def _child_peak_worker(workdir: Path, folders: int, seed: int, name: str, queue) -> None:
+    run_pass(workdir, folders, seed, 0, trace=False, selected=[name])
+    # このプロセスの子プロセス(= 計測した処理のワーカー)だけの最大RSS。Linux では単位は KiB
+    queue.put(float(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss))
+
+
+def measure_child_peak(workdir: Path, folders: int, seed: int, name: str) -> float:
+    """
+    処理を新しいプロセスで1回実行し、その子プロセスの最大RSS(KiB)を返す
+    (getrusage はそれまでに終了した全ての子プロセスの最大値で、tracemalloc 中に fork した
+    子プロセスはトレースを引き継いで大きくなるため、計測用のプロセスを分ける)
+    """
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_child_peak_worker, args=(workdir / 'children', folders, seed, name, queue))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"{name} の子プロセスのメモリ計測に失敗しました (終了コード {process.exitcode})")
+    return queue.get()
+
+
+def stage_names() -> List[str]:
+    return [stage[0] for stage in PIPELINE_STAGES] + [name for name, _ in SERVER_ROUTES]
+
+
+def required_stages(selected: Optional[List[str]]) -> set:
+    """
+    選択された処理と、その前提となる処理の名前を返す(selected が None なら全て)
+    """
+    if not selected:
+        return set(stage_names())
+    requires = {stage[0]: stage[3] for stage in PIPELINE_STAGES}
+    required = set()
+    pending = list(selected)
+    while pending:
+        name = pending.pop()
+        if name not in required:
+            required.add(name)
+            pending.extend(requires.get(name, []))
+    return required
+
+
+def run_benchmark(folders: int, seed: int, repeat: int, requests: int, memory: bool,
+                  workdir: Path, selected: Optional[List[str]]) -> Dict[str, Any]:
+    stages = {}
+    stats = None
+    for i in range(repeat):
+        print(f"計測中: {i + 1}/{repeat} 回目 ({folders}フォルダ)")
+        result = run_pass(workdir, folders, seed, requests, trace=False, selected=selected)
+        stats = result['stats']
+        for name, r in result['stages'].items():
+            stage = stages.setdefault(name, dict(r, seconds_all=[]) if 'skipped' not in r else r)
+            if 'seconds' in r:
+                stage['seconds_all'].append(r['seconds'])
+                stage['seconds'] = min(stage['seconds_all'])
+
+    if memory:
+        print("メモリ計測中 (tracemalloc)")
+        result = run_pass(workdir, folders, seed, requests, trace=True, selected=selected)
+        for name, r in result['stages'].items():
+            if 'peak_kib' in r:
+                stages[name]['peak_kib'] = r['peak_kib']
+        for name, _, _, _, _, children in PIPELINE_STAGES:
+            if children and 'seconds' in stages.get(name, {}):
+                print(f"子プロセスのメモリ計測中 ({name})")
+                stages[name]['child_peak_kib'] = measure_child_peak(workdir, folders, seed, name)
+
+    return {
+        'meta': {
+            'folders': folders,
+            'questions': stats['questions'],
+            'images': stats['images'],
+            'duplicate_images': stats['duplicates'],
+            'seed': seed,
+            'repeat': repeat,
+            'requests': requests,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'stages': stages,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    ベースラインと比較し、回帰した項目のメッセージを返す
+    """
+    regressions = []
+    print(f"\n{'stage':<24}{'seconds':>12}{'baseline':>10}{'ratio':>8}{'peak_kib':>14}{'baseline':>12}{'ratio':>8}")
+    for name, current in results['stages'].items():
+        base = baseline['stages'].get(name)
+        if base is None or 'skipped' in current or 'skipped' in base:
+            continue
+
+        time_ratio = current['seconds'] / base['seconds'] if base['seconds'] > 0 else 1.0
+        line = f"{name:<24}{current['seconds']:>12.3f}{base['seconds']:>10.3f}{time_ratio:>8.2f}"
+        if time_ratio > 1 + threshold and current['seconds'] - base['seconds'] > MIN_SECONDS:
+            regressions.append(f"{name}: 時間 {base['seconds']:.3f}s -> {current['seconds']:.3f}s (x{time_ratio:.2f})")
+
+        if 'peak_kib' in current and 'peak_kib' in base:
+            mem_ratio = current['peak_kib'] / base['peak_kib'] if base['peak_kib'] > 0 else 1.0
+            line += f"{current['peak_kib']:>14.0f}{base['peak_kib']:>12.0f}{mem_ratio:>8.2f}"
+            if mem_ratio > 1 + threshold:
+                regressions.append(f"{name}: メモリ {base['peak_kib']:.0f}KiB -> {current['peak_kib']:.0f}KiB "
+                                   f"(x{mem_ratio:.2f})")
+
+        if 'child_peak_kib' in current and 'child_peak_kib' in base:
+            child_ratio = current['child_peak_kib'] / base['child_peak_kib'] if base['child_peak_kib'] > 0 else 1.0
+            line += f"  (子プロセス x{child_ratio:.2f})"
+            if child_ratio > 1 + threshold:
+                regressions.append(f"{name}: 子プロセスのメモリ {base['child_peak_kib']:.0f}KiB -> "
+                                   f"{current['child_peak_kib']:.0f}KiB (x{child_ratio:.2f})")
+        print(line)
+
+    return regressions
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='合成データでパイプライン・サーバーの性能を計測する')
+    parser.add_argument('--folders', type=int, default=73, help='合成するフォルダ数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    parser.add_argument('--repeat', type=int, default=3, help='時間計測の回数(最小値を採用)')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help='サーバー計測で対象にするフォルダ数')
+    parser.add_argument('--stages', nargs='*', default=None, help='計測する処理名(省略時は全て)')
+    parser.add_argument('--no-memory', action='store_true', help='メモリ計測を行わない')
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT, help='結果の出力ファイル')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='比較するベースライン')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='回帰とみなす増加率')
+    parser.add_argument('--save-baseline', action='store_true', help='結果をベースラインとして保存する')
+    parser.add_argument('--workdir', type=Path, default=None, help='合成データの作成先(省略時は一時フォルダ)')
+    args = parser.parse_args()
+
+    if args.stages is not None:
+        unknown = [name for name in args.stages if name not in stage_names()]
+        if unknown or not args.stages:
+            parser.error(f"不明な処理名です: {', '.join(unknown) or '(指定なし)'} "
+                         f"(指定できる処理: {', '.join(stage_names())})")
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='modelvista_bench_'))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        results = run_benchmark(args.folders, args.seed, args.repeat, args.requests,
+                                not args.no_memory, workdir, args.stages)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"\n=== 計測完了 ===")
+    for name, r in results['stages'].items():
+        if 'skipped' in r:
+            print(f"{name:<24} スキップ: {r['skipped']}")
+        else:
+            peak = f"{r['peak_kib']:>10.0f} KiB" if 'peak_kib' in r else ''
+            if 'child_peak_kib' in r:
+                peak += f" (子プロセス {r['child_peak_kib']:.0f} KiB)"
+            print(f"{name:<24}{r['seconds']:>10.3f} 秒 {peak}")
+    print(f"出力ファイル: {args.output}")
+
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"ベースラインを保存しました: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"\nベースライン {args.baseline} がありません。--save-baseline で作成してください。")
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    # 条件が異なる結果どうしの比較は意味がないため、回帰の判定はしない
+    mismatched = [f"{key}: {baseline['meta'].get(key)} -> {results['meta'].get(key)}"
+                  for key in COMPARE_KEYS if baseline['meta'].get(key) != results['meta'].get(key)]
+    if mismatched:
+        print(f"\nベースラインと条件が異なるため比較しません ({', '.join(mismatched)})")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n=== 性能の回帰を検出しました (閾値: +{args.threshold:.0%}) ===")
+        for message in regressions:
+            print(f"✗ {message}")
+        sys.exit(1)
+    print(f"\n✓ 回帰なし (閾値: +{args.threshold:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の合成データ生成スクリプト
+実データと同じ構成の model/ ツリーを任意のフォルダ数で生成する
+
+生成されるもの:
+    model/<種類><連番>/  image.json, qa_new_ja.json, qa_new_ja2.json(一部), qa_old_ja.json,
+                         req.md, プレースホルダ画像(PNG)
+                         (一部は英語版の類似画像 dgpowerpoint_en-fs8.png、再圧縮した dg*-fs8-fs8.png を含む)
+    out/model/<フォルダ>/       一部のフォルダの画像のバイト単位のコピー
+    model/ModelVista_new20250927_edited.json   model/ 内の編集スクリプトの入力
+    source_model/                              copy_missing_files.py のコピー元(SKIP_/EDIT_ 付きを含む)
+
+使い方:
+    python bench/synth_tree.py /tmp/synth --folders 10000
+"""
+
+import argparse
+import json
+import random
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from typing import List, Dict, Any
+
+# 実データ(73フォルダ・1500問)に近い1フォルダあたりの問題数
+QA_NEW_COUNT = 10
+QA_NEW2_COUNT = 7
+QA_OLD_COUNT = 7
+QA_NEW2_RATIO = 0.6
+
+# 編集スクリプト用の元データの1図あたりの問題数
+SOURCE_QUESTIONS_PER_IMAGE = 7
+
+DIAGRAM_KINDS = ['activity', 'class', 'usecase', 'sequence', 'state', 'component',
+                 'deployment', 'object', 'communication', 'timing']
+DRAWING_METHODS = ['powerpoint', 'handwritten', 'whiteboard']
+TAGS = ['依存関係', '機能要求', '前提条件・制約', '構造理解', '要素数']
+
+# 選択肢の語彙(実データ同様、同じ要素名が多くの問題で繰り返し使われる)
+ELEMENT_NAMES = [f"要素{i:03d}の処理" for i in range(400)]
+
+IMAGE_WIDTH = 256
+IMAGE_HEIGHT = 192
+
+# 重複画像の割合(実データの en/ja 版・-fs8-fs8 の再圧縮・out/model のコピーに相当)
+EN_VARIANT_RATIO = 0.15
+RECOMPRESSED_RATIO = 0.05
+OUT_COPY_RATIO = 0.05
+
+
+def placeholder_pixels(seed: int, width: int = IMAGE_WIDTH, height: int = IMAGE_HEIGHT) -> bytearray:
+    """
+    グレースケール画像の画素を作る(シードごとに異なる模様)
+    """
+    rng = random.Random(seed)
+    pixels = bytearray(b'\xff' * (width * height))
+    # 図形の枠線に見立てた矩形をいくつか描く
+    for _ in range(8):
+        bw, bh = rng.randrange(16, width // 2), rng.randrange(16, height // 2)
+        bx, by = rng.randrange(width - bw), rng.randrange(height - bh)
+        for y in (by, by + bh - 1):
+            pixels[y * width + bx:y * width + bx + bw] = bytes(bw)
+        for y in range(by, by + bh):
+            pixels[y * width + bx] = 0
+            pixels[y * width + bx + bw - 1] = 0
+    return pixels
+
+
+def text_variant(pixels: bytearray, seed: int, width: int = IMAGE_WIDTH) -> bytearray:
+    """
+    図中の文字だけが異なる版(英語版など)に見立てて、小さな領域の画素を変える
+    """
+    rng = random.Random(seed)
+    variant = bytearray(pixels)
+    for _ in range(6):
+        x, y = rng.randrange(width - 12), rng.randrange(len(pixels) // width - 4)
+        for dy in range(4):
+            for dx in range(0, 12, 2):
+                variant[(y + dy) * width + x + dx] ^= 0xff
+    return variant
+
+
+def encode_png(pixels: bytearray, width: int = IMAGE_WIDTH, height: int = IMAGE_HEIGHT, level: int = 6) -> bytes:
+    """
+    標準ライブラリのみでグレースケールPNGにエンコードする
+    """
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)  # フィルタなし
+        rows.extend(pixels[y * width:(y + 1) * width])
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(bytes(rows), level)) + chunk(b'IEND', b''))
+
+
+def make_question(rng: random.Random, authored_by: str) -> Dict[str, Any]:
+    return {
+        'tag': rng.choice(TAGS),
+        'question': f"「{rng.choice(ELEMENT_NAMES)}」が実行される前に必ず完了していなければならない処理はどれか?",
+        'choice': rng.sample(ELEMENT_NAMES, 4),
+        'authored_by': authored_by,
+        'is_translated': False,
+    }
+
+
+def make_image_json(rng: random.Random, folder_name: str, kind: str) -> Dict[str, Any]:
+    texts = rng.sample(ELEMENT_NAMES, 12)
+    image_json = {
+        'title': f"{kind.capitalize()}: {folder_name}",
+        'tag': ['UML', kind],
+        'features': '分岐なし',
+        'elements': {'activity': rng.randrange(3, 15), 'flow': rng.randrange(3, 15)},
+        'overview_counts': {'entities': str(rng.randrange(5, 30)), 'relationships': str(rng.randrange(3, 20))},
+    }
+    for method in DRAWING_METHODS:
+        image_json[f"{method}_ja.png"] = {
+            'drawing_method': method,
+            'lang': 'ja',
+            'text': texts,
+            'text_count': sum(len(t) for t in texts),
+        }
+    return image_json
+
+
+def make_source_questions(rng: random.Random, image_id: str, start: int) -> List[Dict[str, Any]]:
+    """
+    ModelVista_new20250927_edited.json 形式の問題を作る
+    """
+    items = []
+    for i in range(SOURCE_QUESTIONS_PER_IMAGE):
+        choice = [str(n) for n in rng.sample(range(1, 10), 4)]
+        items.append({
+            'problem_id': f"{start + i:03d}",
+            'image_id': image_id,
+            'question': f"この図に含まれる{rng.choice(ELEMENT_NAMES)}の数は？",
+            'answer': choice[0],
+            '画像名': f"{image_id}の図",
+            'この図中の文字数': str(rng.randrange(20, 300)),
+            '構成要素数': str(rng.randrange(3, 30)),
+            '関連要素数': str(rng.randrange(2, 20)),
+            '図表の特徴': '基礎的な図',
+            'choice': choice,
+            'type': f"認{i + 1}",
+        })
+    return items
+
+
+def write_json(path: Path, data: Any) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def generate_tree(root: Path, folders: int, seed: int = 0) -> Dict[str, int]:
+    """
+    root 以下に合成データを生成する
+    戻り値: 生成したフォルダ数・問題数・画像数
+    """
+    rng = random.Random(seed)
+    model_dir = root / 'model'
+    source_dir = root / 'source_model'
+    out_dir = root / 'out' / 'model'
+    model_dir.mkdir(parents=True, exist_ok=True)
+    source_dir.mkdir(parents=True, exist_ok=True)
+
+    source_questions = []
+    question_count = 0
+    image_count = 0
+    duplicate_count = 0
+
+    for n in range(folders):
+        kind = DIAGRAM_KINDS[n % len(DIAGRAM_KINDS)]
+        folder_name = f"{kind}{n // len(DIAGRAM_KINDS) + 1:03d}"
+        folder = model_dir / folder_name
+        folder.mkdir(exist_ok=True)
+
+        write_json(folder / 'image.json', make_image_json(rng, folder_name, kind))
+        (folder / 'req.md').write_text(f"# {folder_name}\n\n合成データ\n", encoding='utf-8')
+
+        qa_files = {
+            'qa_new_ja.json': [make_question(rng, 'claude') for _ in range(QA_NEW_COUNT)],
+            'qa_old_ja.json': [make_question(rng, 'human') for _ in range(QA_OLD_COUNT)],
+        }
+        if rng.random() < QA_NEW2_RATIO:
+            qa_files['qa_new_ja2.json'] = [make_question(rng, 'claude') for _ in range(QA_NEW2_COUNT)]
+
+        for file_name, questions in qa_files.items():
+            write_json(folder / file_name, questions)
+            question_count += len(questions)
+
+        base_seed = seed * 1000003 + n * len(DRAWING_METHODS)
+        images = {}
+        for i, method in enumerate(DRAWING_METHODS):
+            images[method] = placeholder_pixels(base_seed + i)
+            (folder / f"dg{method}_ja-fs8.png").write_bytes(encode_png(images[method]))
+            image_count += 1
+
+        # 重複・類似画像(乱数の消費が他のデータに影響しないよう専用の乱数を使う)
+        dup_rng = random.Random(base_seed)
+        if dup_rng.random() < EN_VARIANT_RATIO:
+            variant = text_variant(images['powerpoint'], base_seed)
+            (folder / 'dgpowerpoint_en-fs8.png').write_bytes(encode_png(variant))
+            image_count += 1
+            duplicate_count += 1
+        if dup_rng.random() < RECOMPRESSED_RATIO:
+            (folder / 'dghandwritten_ja-fs8-fs8.png').write_bytes(encode_png(images['handwritten'], level=9))
+            image_count += 1
+            duplicate_count += 1
+        if dup_rng.random() < OUT_COPY_RATIO:
+            (out_dir / folder_name).mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(folder / 'dgpowerpoint_ja-fs8.png', out_dir / folder_name / 'dgpowerpoint_ja-fs8.png')
+            image_count += 1
+            duplicate_count += 1
+
+        source_questions.extend(make_source_questions(rng, folder_name, len(source_questions)))
+
+        # copy_missing_files.py のコピー元(一部は SKIP_/EDIT_ 付き、qa_new_ja2.json はコピー先にないものを含む)
+        if n % 20 == 0:
+            source_name = f"EDIT_{folder_name}"
+        elif n % 10 == 0:
+            source_name = f"SKIP_{folder_name}"
+        else:
+            source_name = folder_name
+        source_folder = source_dir / source_name
+        source_folder.mkdir(exist_ok=True)
+        (source_folder / 'req.md').write_text(f"# {folder_name}\n", encoding='utf-8')
+        write_json(source_folder / 'qa_new_ja.json', qa_files['qa_new_ja.json'])
+        write_json(source_folder / 'qa_new_ja2.json', [make_question(rng, 'claude') for _ in range(QA_NEW2_COUNT)])
+
+    write_json(model_dir / 'ModelVista_new20250927_edited.json', source_questions)
+
+    return {'folders': folders, 'questions': question_count, 'images': image_count, 'duplicates': duplicate_count}
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='ベンチマーク用の合成 model/ ツリーを生成する')
+    parser.add_argument('root', type=Path, help='出力先')
+    parser.add_argument('--folders', type=int, default=73, help='生成するフォルダ数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+
+    stats = generate_tree(args.root, args.folders, args.seed)
+    print(f"\n=== 生成完了 ===")
+    print(f"フォルダ数: {stats['folders']}")
+    print(f"問題数: {stats['questions']}")
+    print(f"画像数: {stats['images']} (うち重複・類似: {stats['duplicates']})")
+    print(f"出力先: {args.root}")
+
+
+if __name__ == '__main__':
+    main()
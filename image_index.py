@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+画像インデックス作成スクリプト
+model/・working/・out/model 内の画像の知覚ハッシュ(pHash/dHash)を計算し、
+完全一致・類似画像(描画バリエーションやコピー)を検出して image_index.json に出力する
+
+- ハッシュ値はファイルのSHA-256をキーに image_index_cache.json へキャッシュする
+- 未計算の画像のみ並列(プロセスプール)で計算する
+- 類似画像の探索には Multi-Index Hashing (ハミング距離) を使用する
+
+評価スクリプトからは load_index() / eval_reuse_map() を使い、
+バイト単位で同一の画像の再採点をスキップできる
+
+使い方:
+    python image_index.py                      # 既定のフォルダを対象
+    python image_index.py model working        # 対象フォルダを指定
+    python image_index.py --threshold 6        # 類似判定の閾値(ハミング距離)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 対象フォルダ・拡張子
+DEFAULT_ROOTS = ['model', 'working', 'out/model']
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# 出力ファイル
+OUTPUT_FILE = Path('image_index.json')
+CACHE_FILE = Path('image_index_cache.json')
+
+# 類似判定の閾値(64bitハッシュのハミング距離)
+DEFAULT_THRESHOLD = 8
+
+# pHash用: 32x32に縮小し、DCTの左上8x8成分を使う
+PHASH_IMG_SIZE = 32
+PHASH_HASH_SIZE = 8
+_DCT_TABLE = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * PHASH_IMG_SIZE)) for x in range(PHASH_IMG_SIZE)]
+    for u in range(PHASH_HASH_SIZE)
+]
+
+
+def file_sha256(path: Path) -> str:
+    """
+    ファイル内容のSHA-256を計算する
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _bits_to_hex(bits: List[bool]) -> str:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return f"{value:0{len(bits) // 4}x}"
+
+
+def phash(img) -> str:
+    """
+    pHash: グレースケール32x32のDCT低周波8x8成分を中央値で2値化する
+    """
+    small = img.convert('L').resize((PHASH_IMG_SIZE, PHASH_IMG_SIZE), Image.LANCZOS, reducing_gap=3.0)
+    pixels = list(small.tobytes())
+    rows = [pixels[y * PHASH_IMG_SIZE:(y + 1) * PHASH_IMG_SIZE] for y in range(PHASH_IMG_SIZE)]
+
+    # 行方向のDCT(必要な8成分のみ)
+    row_dct = [
+        [sum(c * p for c, p in zip(_DCT_TABLE[u], row)) for u in range(PHASH_HASH_SIZE)]
+        for row in rows
+    ]
+    # 列方向のDCT
+    coeffs = []
+    for v in range(PHASH_HASH_SIZE):
+        for u in range(PHASH_HASH_SIZE):
+            coeffs.append(sum(_DCT_TABLE[v][y] * row_dct[y][u] for y in range(PHASH_IMG_SIZE)))
+
+    median = sorted(coeffs)[len(coeffs) // 2]
+    return _bits_to_hex([c > median for c in coeffs])
+
+
+def dhash(img, hash_size: int = 8) -> str:
+    """
+    dHash: グレースケール(hash_size+1)xhash_sizeの横方向の輝度差を2値化する
+    """
+    small = img.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS, reducing_gap=3.0)
+    pixels = list(small.tobytes())
+    bits = []
+    for y in range(hash_size):
+        row = pixels[y * (hash_size + 1):(y + 1) * (hash_size + 1)]
+        bits.extend(row[x + 1] > row[x] for x in range(hash_size))
+    return _bits_to_hex(bits)
+
+
+def compute_image_hashes(path: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    1枚の画像の知覚ハッシュを計算する(プロセスプールのワーカー)
+    戻り値: (パス, ハッシュ情報 or None, エラーメッセージ or None)
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            # 大きな画像はグレースケール化・縮小してからハッシュを計算する
+            img.draft('L', (PHASH_IMG_SIZE * 8, PHASH_IMG_SIZE * 8))
+            gray = img.convert('L')
+            gray.thumbnail((PHASH_IMG_SIZE * 8, PHASH_IMG_SIZE * 8), Image.LANCZOS, reducing_gap=3.0)
+            return path, {
+                'phash': phash(gray),
+                'dhash': dhash(gray),
+                'width': width,
+                'height': height,
+            }, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+# ハミング距離の計算(int.bit_count は Python 3.10 以降のため、3.9 では bin() で数える)
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(x: int) -> int:
+        return bin(x).count('1')
+
+
+class MultiIndexHash:
+    """
+    ハミング距離による近傍探索(Multi-Index Hashing)
+    ハッシュを threshold//2+1 個のブロックに分割すると、鳩の巣原理により距離 threshold 以内の組は
+    少なくとも1つのブロックで距離1以内になる。各ブロックの値(と1bit違いの値)で候補を引き、距離を確認する
+    """
+
+    def __init__(self, threshold: int, bits: int = 64):
+        self.threshold = threshold
+        count = min(threshold // 2 + 1, bits)
+        bounds = [bits * i // count for i in range(count + 1)]
+        self.blocks = [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(count)]  # (シフト量, ビット幅)
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in self.blocks]
+        self.values: List[int] = []
+        self.items: List[Any] = []
+
+    def add(self, value: int, item: Any) -> None:
+        index = len(self.values)
+        self.values.append(value)
+        self.items.append(item)
+        for (shift, width), table in zip(self.blocks, self.tables):
+            table.setdefault((value >> shift) & ((1 << width) - 1), []).append(index)
+
+    def search(self, value: int) -> List[Tuple[int, Any]]:
+        results = []
+        seen = set()
+        for (shift, width), table in zip(self.blocks, self.tables):
+            key = (value >> shift) & ((1 << width) - 1)
+            for variant in [key] + [key ^ (1 << b) for b in range(width)]:
+                for index in table.get(variant, ()):
+                    if index in seen:
+                        continue
+                    seen.add(index)
+                    d = popcount(value ^ self.values[index])
+                    if d <= self.threshold:
+                        results.append((d, self.items[index]))
+        return results
+
+
+def find_images(roots: List[str]) -> List[Path]:
+    """
+    対象フォルダ以下の画像ファイルを列挙する(隠しフォルダは除外)
+    """
+    images = []
+    for root in roots:
+        root_path = Path(root)
+        if not root_path.is_dir():
+            print(f"警告: {root_path} が見つかりません。スキップします。")
+            continue
+        for dirpath, dirnames, filenames in os.walk(root_path):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(Path(dirpath) / filename)
+    return images
+
+
+def load_cache(cache_file: Path) -> Dict[str, Any]:
+    """
+    キャッシュを読み込む
+    files:  パス -> {size, mtime_ns, sha256} (未変更ファイルのSHA-256再計算を省く)
+    hashes: SHA-256 -> {phash, dhash, width, height}
+    """
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if isinstance(cache, dict):
+                cache.setdefault('files', {})
+                cache.setdefault('hashes', {})
+                return cache
+        except json.JSONDecodeError as e:
+            print(f"警告: {cache_file} のJSON解析エラー: {e} (キャッシュを作り直します)")
+    return {'files': {}, 'hashes': {}}
+
+
+def save_cache(cache: Dict[str, Any], cache_file: Path) -> None:
+    """
+    一時ファイルに書き出してから置き換える(書き込み中に中断してもキャッシュは壊れない)
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, prefix=f".{cache_file.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, cache_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_index(roots: List[str], cache_file: Path = CACHE_FILE,
+                threshold: int = DEFAULT_THRESHOLD, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    画像インデックスを作成する
+    """
+    if Image is None:
+        raise RuntimeError("Pillow がインストールされていません (pip install pillow)")
+
+    cache = load_cache(cache_file)
+    images = find_images(roots)
+
+    # SHA-256(サイズ・更新時刻が変わっていなければキャッシュを使う)
+    entries = []
+    for path in images:
+        key = path.as_posix()
+        stat = path.stat()
+        cached = cache['files'].get(key)
+        if cached and cached.get('size') == stat.st_size and cached.get('mtime_ns') == stat.st_mtime_ns:
+            sha = cached['sha256']
+        else:
+            sha = file_sha256(path)
+            cache['files'][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha}
+        entries.append({'path': key, 'sha256': sha, 'size': stat.st_size})
+
+    # 未計算のSHA-256のみ知覚ハッシュを並列計算(同一内容は1回だけ)
+    pending = {}
+    for entry in entries:
+        if entry['sha256'] not in cache['hashes'] and entry['sha256'] not in pending:
+            pending[entry['sha256']] = entry['path']
+
+    failed = set()
+    if pending:
+        unique_count = len({entry['sha256'] for entry in entries})
+        print(f"知覚ハッシュ計算中: {len(pending)}枚 (キャッシュ済み: {unique_count - len(pending)}枚)")
+        sha_by_path = {p: s for s, p in pending.items()}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path, hashes, error in executor.map(compute_image_hashes, list(pending.values()), chunksize=8):
+                if hashes is None:
+                    print(f"警告: {path} の読み込みに失敗しました: {error}")
+                    failed.add(sha_by_path[path])
+                else:
+                    cache['hashes'][sha_by_path[path]] = hashes
+
+    # 存在しなくなったファイルのキャッシュを削除
+    live_paths = {entry['path'] for entry in entries}
+    cache['files'] = {p: v for p, v in cache['files'].items() if p in live_paths}
+    live_shas = {v['sha256'] for v in cache['files'].values()}
+    cache['hashes'] = {sha: v for sha, v in cache['hashes'].items() if sha in live_shas}
+
+    save_cache(cache, cache_file)
+
+    entries = [e for e in entries if e['sha256'] not in failed]
+    for entry in entries:
+        entry.update(cache['hashes'][entry['sha256']])
+
+    return {
+        'threshold': threshold,
+        'images': entries,
+        'exact_duplicates': find_exact_duplicates(entries),
+        'near_duplicates': find_near_duplicates(entries, threshold),
+    }
+
+
+def find_exact_duplicates(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    バイト単位で同一の画像をグループ化する(先頭のパスを代表とする)
+    """
+    by_sha = {}
+    for entry in entries:
+        by_sha.setdefault(entry['sha256'], []).append(entry)
+
+    groups = []
+    for sha, group in by_sha.items():
+        if len(group) < 2:
+            continue
+        paths = sorted(e['path'] for e in group)
+        groups.append({
+            'sha256': sha,
+            'size': group[0]['size'],
+            'canonical': paths[0],
+            'duplicates': paths[1:],
+        })
+    return groups
+
+
+def find_near_duplicates(entries: List[Dict[str, Any]], threshold: int) -> List[Dict[str, Any]]:
+    """
+    pHashのハミング距離が閾値以内(かつdHashも閾値以内)の画像をグループ化する
+    完全一致の画像は代表1枚にまとめてから比較する
+    """
+    representatives = {}
+    for entry in entries:
+        representatives.setdefault(entry['sha256'], entry)
+    reps = list(representatives.values())
+
+    phashes = [int(entry['phash'], 16) for entry in reps]
+    dhashes = [int(entry['dhash'], 16) for entry in reps]
+    index = MultiIndexHash(threshold)
+
+    # Union-Find でペアをグループにまとめる
+    parent = list(range(len(reps)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # 登録済みの画像だけを検索してから登録するので、各ペアは1回だけ見つかる
+    pairs = []
+    for i, value in enumerate(phashes):
+        for d, j in index.search(value):
+            if popcount(dhashes[i] ^ dhashes[j]) > threshold:
+                continue
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[rj] = ri
+            pairs.append((i, d))
+        index.add(value, i)
+
+    # グループ(根)ごとの最大距離
+    max_distance = {}
+    for i, d in pairs:
+        root = find(i)
+        max_distance[root] = max(max_distance.get(root, 0), d)
+
+    clusters = {}
+    for i in range(len(reps)):
+        clusters.setdefault(find(i), []).append(i)
+
+    sha_to_paths = {}
+    for entry in entries:
+        sha_to_paths.setdefault(entry['sha256'], []).append(entry['path'])
+
+    groups = []
+    for root, members in clusters.items():
+        if len(members) < 2:
+            continue
+        paths = sorted(p for i in members for p in sha_to_paths[reps[i]['sha256']])
+        folders = {str(Path(p).parent) for p in paths}
+        groups.append({
+            'paths': paths,
+            'max_distance': max_distance[root],
+            'scope': 'same_folder' if len(folders) == 1 else 'cross_folder',
+        })
+    groups.sort(key=lambda g: g['paths'][0])
+    return groups
+
+
+def load_index(index_file: Path = OUTPUT_FILE) -> Dict[str, Any]:
+    """
+    image_index.json を読み込む
+    """
+    with open(index_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def eval_reuse_map(index: Dict[str, Any]) -> Dict[str, str]:
+    """
+    重複画像のパス -> 代表画像のパス の対応表を返す
+    評価スクリプトはこの表にあるパスの採点をスキップし、代表画像の結果を再利用できる
+    """
+    reuse = {}
+    for group in index.get('exact_duplicates', []):
+        for path in group['duplicates']:
+            reuse[path] = group['canonical']
+    return reuse
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='画像の知覚ハッシュインデックスを作成し、重複画像を検出する')
+    parser.add_argument('roots', nargs='*', default=DEFAULT_ROOTS, help='対象フォルダ')
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help='類似判定のハミング距離')
+    parser.add_argument('--workers', type=int, default=None, help='並列プロセス数')
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE, help='出力ファイル')
+    parser.add_argument('--cache', type=Path, default=CACHE_FILE, help='キャッシュファイル')
+    args = parser.parse_args()
+
+    try:
+        index = build_index(args.roots, cache_file=args.cache, threshold=args.threshold, workers=args.workers)
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+
+    try:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"エラー: 出力ファイルの書き込みに失敗しました: {e}")
+        sys.exit(1)
+
+    exact = index['exact_duplicates']
+    near = index['near_duplicates']
+    saved_bytes = sum(g['size'] * len(g['duplicates']) for g in exact)
+
+    print(f"\n=== 処理完了 ===")
+    print(f"画像数: {len(index['images'])}")
+    print(f"完全一致グループ数: {len(exact)} (重複ファイル数: {sum(len(g['duplicates']) for g in exact)})")
+    print(f"重複排除で削減可能な容量: {saved_bytes / 1024:.1f} KB")
+    print(f"類似画像グループ数: {len(near)} "
+          f"(フォルダ内: {sum(g['scope'] == 'same_folder' for g in near)}, "
+          f"フォルダ間: {sum(g['scope'] == 'cross_folder' for g in near)})")
+    print(f"出力ファイル: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ import os, json, re, sys, collections
 
 # ===== 設定 =====
 INPUT_JSON = "ModelVista_new20250927_edited.json"  # 図ごとの問題配列（ここからこの図中の文字数を取る）
-MODEL_ROOT = "/Users/obarayui/Git/ModelVistaPlus/model"                                # image.json があるルート
+MODEL_ROOT = os.environ.get("MODELVISTA_MODEL_ROOT", "/Users/obarayui/Git/ModelVistaPlus/model")                                # image.json があるルート
 DRY_RUN    = False                                   # True: 変更内容だけ表示 / False: 実際に書き込み
 TARGET_IDS = None                                   # 例: {"usecase001","class003"}  None=全image_id
 
@@ -3,7 +3,7 @@ import os, re, json, sys, collections
 
 # ===== 設定 =====
 INPUT_JSON   = "ModelVista_new20250927_edited.json"  # 問題配列の元データ
-MODEL_ROOT   = "/Users/obarayui/Git/ModelVistaPlus/model"  # 各 image_id フォルダの親
+MODEL_ROOT   = os.environ.get("MODELVISTA_MODEL_ROOT", "/Users/obarayui/Git/ModelVistaPlus/model")  # 各 image_id フォルダの親
 DRY_RUN      = False                                   # True: 書き込みせず予定だけ表示 / False: 実際に上書き
 TARGET_IDS   = None                                   # 例: {"usecase001", "class003"}  # None なら全 image_id 対象
 
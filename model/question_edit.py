@@ -3,7 +3,7 @@ import os, json, collections, sys
 
 # ===== 設定（必要に応じて変更）=====
 INPUT_JSON  = "ModelVista_new20250927_edited.json"  # 入力元
-OUTPUT_ROOT = "/Users/obarayui/Git/ModelVistaPlus/model"                               # 出力先のルート（model/<image_id>/questionNNN_ja.json）
+OUTPUT_ROOT = os.environ.get("MODELVISTA_MODEL_ROOT", "/Users/obarayui/Git/ModelVistaPlus/model")                               # 出力先のルート（model/<image_id>/questionNNN_ja.json）
 OVERWRITE   = False                                  # 既存ファイルがある場合に上書きするか（False=スキップ, True=上書き）
 
 # ===== 入力チェック =====
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+QA翻訳スクリプト
+qa_all_1030.json(統合済みの問題)を翻訳し、model/<フォルダ>/qa_new_en.json 形式のファイルを作成する
+
+- 翻訳メモリ(translation_memory_<バックエンド>_<言語>.json)に正規化済み原文をキーとして訳文を保存し、
+  一度翻訳した文字列は二度と翻訳バックエンドに送らない
+- 問題文・選択肢・タグなどの重複を除いた未翻訳の文字列だけをバッチにまとめて送信する
+- バックエンド呼び出しの同時実行数は --concurrency で制限する
+
+翻訳バックエンド:
+    stub   ローカルの決定的なダミー翻訳(動作確認用)
+    deepl  DeepL API (環境変数 DEEPL_AUTH_KEY が必要)
+
+使い方:
+    python translate_qa.py --backend deepl            # ドライラン(翻訳対象の件数のみ表示)
+    python translate_qa.py --backend deepl --execute
+
+stub バックエンドの出力は本物の訳文と混ざらないよう、既定で translate_stub_output/ に書き出す
+"""
+
+import argparse
+import json
+import os
+import re
+import shlex
+import sys
+import tempfile
+import unicodedata
+from itertools import islice
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import List, Dict, Any, Iterable
+
+INPUT_FILE = Path('qa_all_1030.json')
+OUTPUT_ROOT = Path('model')
+STUB_OUTPUT_ROOT = Path('translate_stub_output')
+
+SOURCE_LANG = 'ja'
+DEFAULT_TARGET_LANG = 'en'
+
+# 翻訳対象のフィールド(文字列 or 文字列の配列)
+TEXT_FIELDS = ['tag', 'question', 'choice', 'answer', 'correct_answer']
+
+# 統合時に追加されたフィールド(フォルダごとのファイルには出力しない)
+AGGREGATE_FIELDS = ['id', 'source_folder', 'source_file', 'correct_answer']
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+
+# 翻訳メモリを保存する間隔(バッチ数)。最後に必ず保存する
+SAVE_EVERY_BATCHES = 10
+
+
+def normalize_text(text: str) -> str:
+    """
+    翻訳メモリのキー用に文字列を正規化する(NFKC・空白の統一・前後の空白除去)
+    """
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip()
+
+
+class Translator:
+    """
+    翻訳バックエンドの基底クラス
+    translate_batch() は入力と同じ順序・同じ件数の訳文を返すこと
+    """
+    name = 'base'
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        raise NotImplementedError
+
+
+class StubTranslator(Translator):
+    """
+    ローカルのダミー翻訳(同じ入力には常に同じ出力を返す)
+    """
+    name = 'stub'
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        return [f"[{target_lang}] {text}" for text in texts]
+
+
+class DeepLTranslator(Translator):
+    """
+    DeepL API による翻訳
+    """
+    name = 'deepl'
+
+    def __init__(self):
+        self.auth_key = os.environ.get('DEEPL_AUTH_KEY')
+        if not self.auth_key:
+            raise RuntimeError("環境変数 DEEPL_AUTH_KEY が設定されていません")
+        # フリープランのキーは末尾が ':fx'
+        host = 'api-free.deepl.com' if self.auth_key.endswith(':fx') else 'api.deepl.com'
+        self.url = f"https://{host}/v2/translate"
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        target = 'EN-US' if target_lang.lower() == 'en' else target_lang.upper()
+        body = json.dumps({
+            'text': texts,
+            'source_lang': source_lang.upper(),
+            'target_lang': target,
+        }).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, method='POST', headers={
+            'Authorization': f"DeepL-Auth-Key {self.auth_key}",
+            'Content-Type': 'application/json',
+        })
+        with urllib.request.urlopen(request, timeout=60) as response:
+            result = json.loads(response.read().decode('utf-8'))
+        return [t['text'] for t in result['translations']]
+
+
+BACKENDS = {
+    'stub': StubTranslator,
+    'deepl': DeepLTranslator,
+}
+
+
+class TranslationMemory:
+    """
+    正規化済み原文 -> 訳文 の永続キャッシュ
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, str] = {}
+        if path.exists():
+            # 壊れたファイルを空のメモリで上書きすると翻訳済みの分を失うため、続行しない
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except json.JSONDecodeError as e:
+                raise RuntimeError(f"翻訳メモリ {path} のJSON解析エラー: {e} (ファイルを確認してください)")
+            if not isinstance(entries, dict):
+                raise RuntimeError(f"翻訳メモリ {path} はオブジェクト形式ではありません")
+            self.entries = entries
+
+    def get(self, text: str):
+        return self.entries.get(normalize_text(text))
+
+    def __contains__(self, text: str) -> bool:
+        return normalize_text(text) in self.entries
+
+    def update(self, sources: List[str], translations: List[str]) -> None:
+        for source, translation in zip(sources, translations):
+            self.entries[normalize_text(source)] = translation
+
+    def save(self) -> None:
+        """
+        一時ファイルに書き出してから置き換える(書き込み中に中断しても元のファイルは壊れない)
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def iter_strings(value: Any) -> Iterable[str]:
+    """
+    値に含まれる文字列を列挙する(入れ子のリストも translate_value と同じようにたどる)
+    """
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for v in value:
+            yield from iter_strings(v)
+
+
+def iter_texts(question: Dict[str, Any]) -> Iterable[str]:
+    """
+    問題内の翻訳対象の文字列を列挙する
+    """
+    for field in TEXT_FIELDS:
+        yield from iter_strings(question.get(field))
+
+
+def collect_unique_texts(questions: List[Dict[str, Any]]) -> List[str]:
+    """
+    全問題から翻訳対象の文字列を正規化キーで重複排除して集める(登場順)
+    """
+    unique = {}
+    for question in questions:
+        for text in iter_texts(question):
+            key = normalize_text(text)
+            if key and key not in unique:
+                unique[key] = key
+    return list(unique.values())
+
+
+def translate_missing(texts: List[str], memory: TranslationMemory, translator: Translator,
+                      target_lang: str, batch_size: int, concurrency: int) -> int:
+    """
+    翻訳メモリにない文字列をバッチに分けて並列に翻訳し、翻訳メモリに追加する
+    戻り値: 翻訳に失敗した文字列の数
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    remaining = iter(batches)
+    pending = {}
+    done = 0
+    failed = 0
+    unsaved = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                # 中断時に未送信のバッチまで送らないよう、投入するのは同時実行数の分だけにする
+                for batch in islice(remaining, concurrency - len(pending)):
+                    pending[executor.submit(translator.translate_batch, batch, SOURCE_LANG, target_lang)] = batch
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch = pending.pop(future)
+                    done += 1
+                    try:
+                        translations = future.result()
+                        if len(translations) != len(batch):
+                            raise ValueError(f"訳文の件数が一致しません ({len(translations)} != {len(batch)})")
+                    except Exception as e:
+                        print(f"警告: バッチの翻訳に失敗しました: {e}")
+                        failed += len(batch)
+                        continue
+                    memory.update(batch, translations)
+                    print(f"翻訳中: {done}/{len(batches)} バッチ")
+                    # 途中で中断しても翻訳済みの分を失わないよう、一定バッチごとに保存する
+                    unsaved += 1
+                    if unsaved >= SAVE_EVERY_BATCHES:
+                        memory.save()
+                        unsaved = 0
+    finally:
+        # 中断された場合も、実行中だったバッチのうち翻訳が完了した分はメモリに残す
+        for future, batch in pending.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                translations = future.result()
+                if len(translations) == len(batch):
+                    memory.update(batch, translations)
+                    unsaved += 1
+        if unsaved:
+            memory.save()
+
+    return failed
+
+
+def translate_value(value: Any, memory: TranslationMemory) -> Any:
+    if isinstance(value, str):
+        if not normalize_text(value):
+            return value
+        translation = memory.get(value)
+        if translation is None:
+            # 訳文がないまま null を書き出さないよう、ここで止める
+            raise RuntimeError(f"翻訳メモリに訳文がありません: {value!r}")
+        return translation
+    if isinstance(value, list):
+        return [translate_value(v, memory) for v in value]
+    return value
+
+
+def translate_question(question: Dict[str, Any], memory: TranslationMemory) -> Dict[str, Any]:
+    """
+    翻訳メモリを使って問題を翻訳し、is_translated を true にする
+    """
+    translated = question.copy()
+    for field in TEXT_FIELDS:
+        if field in translated:
+            translated[field] = translate_value(translated[field], memory)
+    translated['is_translated'] = True
+    return translated
+
+
+def output_file_name(source_file: str, target_lang: str) -> str:
+    """
+    出力ファイル名を決める (例: qa_new_ja2.json -> qa_new_en2.json)
+    """
+    return re.sub(rf'_{SOURCE_LANG}(?=\d*\.json$)', f'_{target_lang}', source_file)
+
+
+def write_outputs(questions: List[Dict[str, Any]], output_root: Path, target_lang: str) -> int:
+    """
+    翻訳済みの問題を元のフォルダ・ファイルごとに書き出す
+    戻り値: 書き出したファイル数
+    """
+    by_file = {}
+    for question in questions:
+        key = (question['source_folder'], output_file_name(question['source_file'], target_lang))
+        record = {k: v for k, v in question.items() if k not in AGGREGATE_FIELDS}
+        by_file.setdefault(key, []).append(record)
+
+    for (folder_name, file_name), records in by_file.items():
+        out_dir = output_root / folder_name
+        out_dir.mkdir(parents=True, exist_ok=True)
+        with open(out_dir / file_name, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        print(f"書き込み: {out_dir / file_name} ({len(records)}問)")
+
+    return len(by_file)
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='統合済みQAを翻訳し、言語別のQAファイルを作成する')
+    parser.add_argument('--input', type=Path, default=INPUT_FILE, help='入力ファイル')
+    parser.add_argument('--output-root', type=Path, default=None,
+                        help=f"出力先のルート(既定: {OUTPUT_ROOT}、stub は {STUB_OUTPUT_ROOT})")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), required=True, help='翻訳バックエンド')
+    parser.add_argument('--target-lang', default=DEFAULT_TARGET_LANG, help='翻訳先の言語')
+    parser.add_argument('--memory', type=Path, default=None, help='翻訳メモリのファイル')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='1回の呼び出しで送る文字列数')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='同時に呼び出す数の上限')
+    parser.add_argument('--execute', action='store_true', help='実際に翻訳してファイルを書き出す')
+    args = parser.parse_args()
+
+    if args.output_root is None:
+        args.output_root = STUB_OUTPUT_ROOT if args.backend == 'stub' else OUTPUT_ROOT
+
+    if not args.input.exists():
+        print(f"エラー: {args.input} が見つかりません。")
+        sys.exit(1)
+
+    try:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"エラー: {args.input} のJSON解析エラー: {e}")
+        sys.exit(1)
+
+    if not isinstance(questions, list):
+        print(f"エラー: {args.input} は配列形式ではありません。")
+        sys.exit(1)
+
+    # 翻訳済み(is_translated: true)の問題は対象外
+    questions = [q for q in questions if not q.get('is_translated')]
+
+    memory_path = args.memory or Path(f"translation_memory_{args.backend}_{args.target_lang}.json")
+    try:
+        memory = TranslationMemory(memory_path)
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+
+    texts = collect_unique_texts(questions)
+    missing = [t for t in texts if t not in memory]
+
+    print(f"問題数: {len(questions)}")
+    print(f"重複排除後の文字列数: {len(texts)}")
+    print(f"翻訳メモリに存在: {len(texts) - len(missing)}")
+    print(f"新規に翻訳する文字列数: {len(missing)} ({sum(len(t) for t in missing)}文字)")
+    print(f"出力先: {args.output_root}")
+
+    if not args.execute:
+        print("\n実際に翻訳を実行するには、--execute オプションを付けて実行してください：")
+        print(' '.join(shlex.quote(a) for a in ['python', 'translate_qa.py', *sys.argv[1:], '--execute']))
+        return
+
+    try:
+        translator = BACKENDS[args.backend]()
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+
+    if missing:
+        failed = translate_missing(missing, memory, translator, args.target_lang,
+                                   args.batch_size, args.concurrency)
+        if failed:
+            print(f"エラー: {failed}件の文字列が翻訳できませんでした。再実行すると未翻訳の分のみ送信します。")
+            sys.exit(1)
+
+    try:
+        translated = [translate_question(q, memory) for q in questions]
+    except RuntimeError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    file_count = write_outputs(translated, args.output_root, args.target_lang)
+
+    print(f"\n=== 処理完了 ===")
+    print(f"翻訳メモリ: {memory_path} ({len(memory.entries)}件)")
+    print(f"出力ファイル数: {file_count}")
+
+
+if __name__ == '__main__':
+    main()